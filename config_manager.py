@@ -5,11 +5,19 @@ Handles API keys, user preferences, and application settings.
 
 import os
 import json
+import atexit
+import sqlite3
+import threading
 from typing import Optional, Dict, Any
 
 # Configuration file path
 CONFIG_FILE = "user_config.json"
-CACHE_FILE = "ai_analysis_cache.json"
+CACHE_FILE = "ai_analysis_cache.db"
+# JSON cache written by earlier versions; imported once when the database is first created
+LEGACY_CACHE_FILE = "ai_analysis_cache.json"
+
+# Seconds to wait for further setting changes before writing the config file
+CONFIG_FLUSH_DELAY = 0.5
 
 
 class ConfigManager:
@@ -19,7 +27,13 @@ class ConfigManager:
         self.config_path = os.path.join(os.getcwd(), CONFIG_FILE)
         self.cache_path = os.path.join(os.getcwd(), CACHE_FILE)
         self._config = self._load_config()
+        self._cache_db = None
         self._cache = self._load_cache()
+        self._cache_lock = threading.Lock()  # AI analyses finish on worker threads
+        self._config_lock = threading.Lock()
+        self._config_dirty = False
+        self._flush_timer = None
+        atexit.register(self.flush_config)
 
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from file."""
@@ -41,30 +55,84 @@ class ConfigManager:
         }
 
     def _save_config(self):
-        """Save configuration to file."""
-        try:
-            with open(self.config_path, "w") as f:
-                json.dump(self._config, f, indent=2)
-        except IOError as e:
-            print(f"Warning: Could not save config file: {e}")
+        """Mark the configuration dirty and schedule a write on a background thread."""
+        with self._config_lock:
+            self._config_dirty = True
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(CONFIG_FLUSH_DELAY, self.flush_config)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _set_config(self, key: str, value: Any):
+        """Change one setting under _config_lock, so a flush never serializes the dict mid-update, and save it."""
+        with self._config_lock:
+            self._config[key] = value
+        self._save_config()
 
-    def _load_cache(self) -> Dict[str, Any]:
-        """Load AI analysis cache from file."""
-        if os.path.exists(self.cache_path):
+    def flush_config(self):
+        """Write pending configuration changes to file, replacing it atomically."""
+        with self._config_lock:
+            self._flush_timer = None
+            if not self._config_dirty:
+                return
+            tmp_path = f"{self.config_path}.tmp"
             try:
-                with open(self.cache_path, "r") as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
-                pass
-        return {}
+                with open(tmp_path, "w") as f:
+                    json.dump(self._config, f, indent=2)
+                os.replace(tmp_path, self.config_path)
+            except (OSError, TypeError, ValueError) as e:
+                # Still dirty, so the next flush (at the latest the one at exit) tries again
+                print(f"Warning: Could not save config file: {e}")
+                return
+            self._config_dirty = False
 
-    def _save_cache(self):
-        """Save AI analysis cache to file."""
+    def _load_cache(self) -> Dict[str, Any]:
+        """
+        Open the AI analysis cache database and load it into memory; lookups are served from the dict.
+        Without a usable database the cache only lasts for this session.
+        """
+        is_new = not os.path.exists(self.cache_path)
         try:
-            with open(self.cache_path, "w") as f:
-                json.dump(self._cache, f, indent=2)
-        except IOError as e:
-            print(f"Warning: Could not save cache file: {e}")
+            db = sqlite3.connect(self.cache_path, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("CREATE TABLE IF NOT EXISTS analysis_cache (path TEXT PRIMARY KEY, safety TEXT, reason TEXT)")
+            cache = {
+                path: {"safety": safety, "reason": reason}
+                for path, safety, reason in db.execute("SELECT path, safety, reason FROM analysis_cache")
+            }
+        except sqlite3.Error as e:
+            print(f"Warning: Could not open cache database: {e}")
+            return {}
+        self._cache_db = db
+        if is_new:
+            cache.update(self._import_legacy_cache())
+        return cache
+
+    def _import_legacy_cache(self) -> Dict[str, Any]:
+        """Copy the old JSON cache file into the new database."""
+        legacy_path = os.path.join(os.path.dirname(self.cache_path), LEGACY_CACHE_FILE)
+        if not os.path.exists(legacy_path):
+            return {}
+        try:
+            with open(legacy_path, "r") as f:
+                legacy_cache = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return {}
+        self._save_cache(legacy_cache)
+        return legacy_cache
+
+    def _save_cache(self, results: Dict[str, Dict[str, Any]]):
+        """Insert or replace cache rows for results. Callers hold _cache_lock, except during __init__."""
+        if self._cache_db is None:
+            return
+        try:
+            self._cache_db.executemany(
+                "INSERT OR REPLACE INTO analysis_cache (path, safety, reason) VALUES (?, ?, ?)",
+                [(path, result.get("safety"), result.get("reason")) for path, result in results.items()],
+            )
+        except sqlite3.Error as e:
+            print(f"Warning: Could not save cache entries: {e}")
 
     # API Key Management
     def get_gemini_api_key(self) -> str:
@@ -73,8 +141,7 @@ class ConfigManager:
 
     def set_gemini_api_key(self, key: str):
         """Set Gemini API key."""
-        self._config["gemini_api_key"] = key.strip()
-        self._save_config()
+        self._set_config("gemini_api_key", key.strip())
 
     def get_openai_api_key(self) -> str:
         """Get OpenAI API key."""
@@ -82,8 +149,7 @@ class ConfigManager:
 
     def set_openai_api_key(self, key: str):
         """Set OpenAI API key."""
-        self._config["openai_api_key"] = key.strip()
-        self._save_config()
+        self._set_config("openai_api_key", key.strip())
 
     def get_preferred_ai_provider(self) -> str:
         """Get preferred AI provider."""
@@ -92,8 +158,7 @@ class ConfigManager:
     def set_preferred_ai_provider(self, provider: str):
         """Set preferred AI provider."""
         if provider in ["gemini", "openai"]:
-            self._config["preferred_ai_provider"] = provider
-            self._save_config()
+            self._set_config("preferred_ai_provider", provider)
 
     def has_valid_api_key(self) -> bool:
         """Check if we have a valid API key for the preferred provider."""
@@ -111,8 +176,7 @@ class ConfigManager:
 
     def set_ai_analysis_enabled(self, enabled: bool):
         """Enable or disable AI analysis."""
-        self._config["enable_ai_analysis"] = enabled
-        self._save_config()
+        self._set_config("enable_ai_analysis", enabled)
 
     def is_debug_mode(self) -> bool:
         """Check if debug mode is enabled."""
@@ -125,16 +189,28 @@ class ConfigManager:
             return None
         return self._cache.get(path)
 
-    def cache_analysis(self, path: str, result: Dict[str, Any]):
-        """Cache AI analysis result for a path."""
-        if self._config.get("cache_ai_results", True):
-            self._cache[path] = result
-            self._save_cache()
+    def cache_analysis(self, path: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Cache AI analysis result for a path and return the cached entry.
+        A result another thread cached first is kept and returned instead.
+        """
+        if not self._config.get("cache_ai_results", True):
+            return result
+        with self._cache_lock:
+            cached = self._cache.setdefault(path, result)
+            if cached is result:
+                self._save_cache({path: result})
+        return cached
 
     def clear_cache(self):
         """Clear all cached AI analysis results."""
-        self._cache = {}
-        self._save_cache()
+        with self._cache_lock:
+            self._cache = {}
+            if self._cache_db is not None:
+                try:
+                    self._cache_db.execute("DELETE FROM analysis_cache")
+                except sqlite3.Error as e:
+                    print(f"Warning: Could not clear cache database: {e}")
 
     def get_cache_size(self) -> int:
         """Get number of cached analysis results."""
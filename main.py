@@ -5,16 +5,19 @@ A multi-functional macOS utility for cleaning junk files and analyzing disk usag
 
 import flet as ft
 import os
-import math
 import threading
 import logging
 import shutil
-from concurrent.futures import ThreadPoolExecutor
+import time
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from operator import itemgetter
 
 # Import our custom modules
 from config import debug_log
-from safety_analysis import get_safety_info, get_safety_color, ai_analyze_path
-from deletion import create_deletion_manager
+from safety_analysis import classify_path, get_safety_info, get_safety_color, ai_analyze_path
 from config_manager import config_manager
 from settings_ui import create_settings_tab
 from quick_clean import (
@@ -28,9 +31,66 @@ from quick_clean import (
     CRASH_REPORTS,
     TEMP_FILES,
     APP_SUPPORT_CACHES,
+    directory_level_cache,
+    scan_directory_level,
+    shutdown_pools,
+    get_size,
     format_size as qc_format_size,
 )
 
+HOME = os.path.expanduser("~")
+
+# Threads sizing directories in the Disk Analyzer; the work is stat()-bound, so oversubscribe the CPUs
+SCAN_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+
+# One pool for the app's lifetime, so clicking through folders does not spin threads up and down per scan.
+# Threads start lazily on first use; a cancelled scan cancels its own queued futures, and the rest are
+# cancelled once the window closes.
+SCAN_POOL = ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="scan")
+
+# Minimum seconds between progress redraws while scanning
+PROGRESS_UPDATE_INTERVAL = 0.1
+
+# Disk Analyzer rows built per page; the rest of a large listing waits behind a "Show more" row
+SCAN_RESULTS_PAGE_SIZE = 500
+
+# Scan targets offered by the Disk Analyzer dropdown as (value, label) pairs
+DIRECTORY_OPTIONS = [
+    ("/", "System Root (/)"),
+    ("/System", "System Files (/System)"),
+    ("/Applications", "Applications (/Applications)"),
+    ("/Users", "All Users (/Users)"),
+    (HOME, "My Home (~/)"),
+    (os.path.join(HOME, "Library"), "My Library (~/Library)"),
+    (os.path.join(HOME, "Downloads"), "Downloads (~/Downloads)"),
+    (os.path.join(HOME, "Documents"), "Documents (~/Documents)"),
+    (os.path.join(HOME, "Desktop"), "Desktop (~/Desktop)"),
+    (os.path.join(HOME, "Pictures"), "Pictures (~/Pictures)"),
+    (os.path.join(HOME, "Movies"), "Movies (~/Movies)"),
+    (os.path.join(HOME, "Music"), "Music (~/Music)"),
+    ("clear_cache", "🗑️ Clear Cache"),
+]
+
+
+@dataclass(slots=True)
+class ScanEntry:
+    """One row of Disk Analyzer results: a file or directory directly inside the scanned folder."""
+
+    path: str
+    size: int
+    is_dir: bool
+
+
+@lru_cache(maxsize=None)
+def read_license_text():
+    """Read the bundled LICENSE file once; its text is static for the life of the process."""
+    license_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "LICENSE")
+    try:
+        with open(license_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except Exception as e:
+        return f"Error reading license file: {e}"
+
 
 def main(page: ft.Page):
     page.title = "CoffeeCleaner"
@@ -52,7 +112,7 @@ def main(page: ft.Page):
     page.window_prevent_close = False
 
     # Set up logging
-    log_filename = os.path.join(os.path.expanduser("~"), "Desktop", "mac_cleaner.log")
+    log_filename = os.path.join(HOME, "Desktop", "mac_cleaner.log")
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s - %(levelname)s - %(message)s",
@@ -80,9 +140,8 @@ def main(page: ft.Page):
         if size_bytes == 0:
             return "0B"
         size_name = ("B", "KB", "MB", "GB", "TB")
-        i = int(math.floor(math.log(size_bytes, 1024)))
-        p = math.pow(1024, i)
-        s = round(size_bytes / p, 2)
+        i = min((size_bytes.bit_length() - 1) // 10, len(size_name) - 1)
+        s = round(size_bytes / (1 << (i * 10)), 2)
         return f"{s} {size_name[i]}"
 
     # --- Quick Clean Tab --- #
@@ -98,6 +157,10 @@ def main(page: ft.Page):
     app_support_caches_checkbox = ft.Checkbox(label="App Support Caches", value=True)
 
     analyze_button = ft.ElevatedButton(text="Analyze")
+    refresh_sizes_button = ft.ElevatedButton(
+        text="Refresh Sizes",
+        tooltip="Re-read every file size; Analyze reuses folders whose contents were not added, removed or renamed",
+    )
     clean_button = ft.ElevatedButton(text="Clean", disabled=True)
     analysis_results_text = ft.Text("Select categories and click Analyze")
     quick_clean_file_list = ft.ListView(height=260, spacing=2, auto_scroll=False)
@@ -131,19 +194,16 @@ def main(page: ft.Page):
         return cats
 
     def rebuild_list_ui():
-        quick_clean_file_list.controls.clear()
+        # Build the rows locally and swap them in once so Flet sees a single list change
+        controls = []
         # Category grouping
         # Sort categories by total size (largest first)
-        cat_sizes = []
-        for cat, items in current_result["category_map"].items():
-            total_cat_size = sum(i.size for i in items)
-            cat_sizes.append((cat, total_cat_size))
-        cat_sizes.sort(key=lambda x: x[1], reverse=True)
-        for cat, _ in cat_sizes:
+        cat_sizes = [(cat, sum(map(get_size, items))) for cat, items in current_result["category_map"].items()]
+        cat_sizes.sort(key=itemgetter(1), reverse=True)
+        for cat, total_cat_size in cat_sizes:
             items = current_result["category_map"][cat]
-            sorted_items = sorted(items, key=lambda i: i.size, reverse=True)
+            sorted_items = sorted(items, key=get_size, reverse=True)
             subtotal = sum(i.size for i in sorted_items if i.path in current_result["selected"])
-            total_cat_size = sum(i.size for i in sorted_items)
             is_folded = category_folded.get(cat, True)  # Default to folded
             chevron_icon = ft.Icons.KEYBOARD_ARROW_RIGHT if is_folded else ft.Icons.KEYBOARD_ARROW_DOWN
 
@@ -175,7 +235,7 @@ def main(page: ft.Page):
                 return handler
 
             cat_checkbox.on_change = make_cat_toggle(cat, sorted_items, cat_checkbox)
-            quick_clean_file_list.controls.append(
+            controls.append(
                 ft.Row(
                     [ft.IconButton(icon=chevron_icon, on_click=make_fold_toggle(cat), icon_size=18), cat_checkbox],
                     spacing=4,
@@ -199,7 +259,7 @@ def main(page: ft.Page):
                         return handler
 
                     item_cb.on_change = make_item_toggle(it.path)
-                    rel = os.path.relpath(it.path, os.path.expanduser("~"))
+                    rel = os.path.relpath(it.path, HOME)
 
                     def create_quick_clean_ai_handler(path):
                         def handler(e):
@@ -245,7 +305,7 @@ def main(page: ft.Page):
                         on_click=create_quick_clean_ai_handler(it.path),
                         icon_color=ai_icon_color,
                     )
-                    quick_clean_file_list.controls.append(
+                    controls.append(
                         ft.Row(
                             [
                                 ft.Container(width=48, content=item_cb),
@@ -257,6 +317,7 @@ def main(page: ft.Page):
                             alignment=ft.MainAxisAlignment.START,
                         )
                     )
+        quick_clean_file_list.controls = controls
 
     def update_summary():
         total_selected_size = sum(i.size for i in current_result["items"] if i.path in current_result["selected"])
@@ -266,25 +327,28 @@ def main(page: ft.Page):
         clean_button.disabled = total_selected_size == 0
 
     def analyze_files(e):
-        analysis_results_text.value = "Analyzing... (streaming)"
+        cats = selected_categories()
+        total_cats = len(cats)
+
         summary_text.value = ""
         quick_clean_file_list.controls.clear()
         clean_button.disabled = True
-        progress_bar.visible = True
-        progress_bar.value = 0
         current_result["items"] = []
         current_result["category_map"] = {}
         current_result["selected"].clear()
-        page.update()
 
-        cats = selected_categories()
-        total_cats = len(cats)
+        # Nothing to scan: report it in the same update instead of flashing the progress bar
         if total_cats == 0:
             analysis_results_text.value = "No categories selected"
             progress_bar.visible = False
             page.update()
             return
 
+        analysis_results_text.value = "Analyzing... (streaming)"
+        progress_bar.visible = True
+        progress_bar.value = 0
+        page.update()
+
         from quick_clean import analyze_quick_clean_iter
 
         def run_analysis():
@@ -307,7 +371,7 @@ def main(page: ft.Page):
                     page.update()
             # Final summary
             try:
-                total_size = sum(i.size for i in current_result["items"])
+                total_size = sum(map(get_size, current_result["items"]))
                 analysis_results_text.value = (
                     f"Found {qc_format_size(total_size)} of removable data. Expand to see details."
                 )
@@ -325,7 +389,6 @@ def main(page: ft.Page):
             return
         analysis_results_text.value = f"Deleting {len(selected_items)} selected items..."
         update_status(f"Starting quick clean deletion of {len(selected_items)} items")
-        page.update()
 
         def run_delete():
             from deletion import perform_deletion as deletion_perform_deletion
@@ -333,19 +396,23 @@ def main(page: ft.Page):
             deleted, errors = deletion_perform_deletion(selected_items)
             try:
                 analysis_results_text.value = f"Deleted {deleted} items with {errors} errors"
-                update_status(f"Quick clean complete: {deleted} deleted, {errors} errors")
                 clean_button.disabled = True
                 quick_clean_file_list.controls.clear()
                 summary_text.value = ""
-                page.update()
+                update_status(f"Quick clean complete: {deleted} deleted, {errors} errors")
             except Exception as ex:
                 analysis_results_text.value = f"Deletion UI error: {ex}"
                 update_status(f"Quick clean error: {ex}")
-                page.update()
 
         threading.Thread(target=run_delete, daemon=True).start()
 
+    def refresh_sizes(e):
+        # Files rewritten in place leave their folder's mtime alone, so only a full re-read picks up their new size
+        directory_level_cache.clear()
+        analyze_files(e)
+
     analyze_button.on_click = analyze_files
+    refresh_sizes_button.on_click = refresh_sizes
     clean_button.on_click = clean_files
 
     quick_clean_tab = ft.Column(
@@ -387,6 +454,7 @@ def main(page: ft.Page):
             ft.Row(
                 [
                     analyze_button,
+                    refresh_sizes_button,
                     clean_button,
                 ],
                 spacing=10,
@@ -411,7 +479,31 @@ def main(page: ft.Page):
     scan_results_list = ft.ListView(expand=True, spacing=5, auto_scroll=True)
     breadcrumb_row = ft.Row([], spacing=5)
 
-    scan_thread_state = {"cancelled": False, "current_path": os.path.expanduser("~")}
+    scan_thread_state = {"cancelled": False, "current_path": HOME}
+
+    # Checked rows of the current listing (path -> safety level), kept up to date by the row checkboxes.
+    # selection_state counts the red ones so the delete guard is O(1); change both through select_path/deselect_path.
+    selected_paths = {}
+    selection_state = {"unsafe": 0}
+
+    def select_path(path, safety):
+        selection_state["unsafe"] += (safety == "red") - (selected_paths.get(path) == "red")
+        selected_paths[path] = safety
+
+    def deselect_path(path):
+        if selected_paths.pop(path, None) == "red":
+            selection_state["unsafe"] -= 1
+
+    def clear_selection():
+        selected_paths.clear()
+        selection_state["unsafe"] = 0
+
+    def clear_scan_results():
+        """Empty the listing together with its selection, so rows that are no longer shown cannot be deleted."""
+        scan_results_list.controls.clear()
+        clear_selection()
+        delete_button.visible = False
+        confirmation_row.visible = False
 
     # Directory scan cache - stores scan results to avoid rescanning
     directory_cache = {}
@@ -426,36 +518,12 @@ def main(page: ft.Page):
                 del directory_cache[key]
             debug_log(f"[DiskAnalyzer] Cache trimmed, now has {len(directory_cache)} entries")
 
-    def get_size_threaded(path_info):
-        path = path_info["path"]
-        if scan_thread_state["cancelled"]:
-            return None
-
-        update_status(f"Scanning: {os.path.basename(path)}")
-
-        total_size = 0
+    def get_file_size(path):
         try:
-            if path_info["is_dir"]:
-                for dirpath, _, filenames in os.walk(path):
-                    if scan_thread_state["cancelled"]:
-                        return None
-                    for f in filenames:
-                        fp = os.path.join(dirpath, f)
-                        if not os.path.islink(fp):
-                            try:
-                                total_size += os.path.getsize(fp)
-                            except OSError:
-                                pass
-            else:
-                total_size = os.path.getsize(path)
+            return os.path.getsize(path)
         except OSError as e:
             update_status(f"Error scanning: {os.path.basename(path)} - {str(e)}")
-            return {
-                "path": path,
-                "size": 0,
-                "is_dir": path_info["is_dir"],
-            }  # Return 0 if not accessible
-        return {"path": path, "size": total_size, "is_dir": path_info["is_dir"]}
+            return 0  # Return 0 if not accessible
 
     def scan_directory_thread(selected_path):
         debug_log(f"[DiskAnalyzer] Starting scan of directory: {selected_path}")
@@ -475,7 +543,7 @@ def main(page: ft.Page):
             update_status(f"Error accessing: {selected_path} - {e.strerror}")
             # --- FIX: Update breadcrumbs and add ".." entry even on error ---
             update_breadcrumbs(selected_path)
-            scan_results_list.controls.clear()
+            clear_scan_results()
             if selected_path != "/":
                 parent_dir = os.path.dirname(selected_path)
                 scan_results_list.controls.append(
@@ -489,27 +557,63 @@ def main(page: ft.Page):
             reset_scan_ui()
             return
 
-        results = []
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            futures = [executor.submit(get_size_threaded, entry) for entry in entries]
-            for i, future in enumerate(futures):
-                if scan_thread_state["cancelled"]:
-                    executor.shutdown(wait=False, cancel_futures=True)
-                    break
-
-                result = future.result()
-                if result:
-                    results.append(result)
-
-                if i % 10 == 0 or i == len(futures) - 1:
-                    print(f"[DiskAnalyzer] Processed {i+1}/{len(futures)} entries in {selected_path}")
-
-                progress = (i + 1) / len(entries)
-                scan_progress_bar.value = progress
-                page.update()
+        results = [
+            ScanEntry(entry["path"], get_file_size(entry["path"]), False) for entry in entries if not entry["is_dir"]
+        ]
+        top_dirs = [entry["path"] for entry in entries if entry["is_dir"]]
+        completed = len(results)
+
+        # Every directory in the tree is its own task, so one huge entry (e.g. ~/Library)
+        # is spread over all workers instead of keeping a single thread busy.
+        dir_totals = dict.fromkeys(top_dirs, 0)
+        dirs_remaining = dict.fromkeys(top_dirs, 1)  # unfinished directory tasks per top-level entry
+        queued = deque((path, path) for path in top_dirs)  # (directory, top-level entry it belongs to)
+
+        # Progress is finished tasks over tasks discovered so far (top-level files count as finished ones).
+        # The total grows as subdirectories turn up, so the bar is only ever moved forward.
+        tasks_done = completed
+        tasks_found = len(entries)
+        progress = 0.0
+        last_progress_update = 0.0
+        running = {}
+        while queued or running:
+            if scan_thread_state["cancelled"]:
+                for future in running:
+                    future.cancel()
+                break
+
+            # Keep a bounded number of tasks in flight rather than one future per directory
+            while queued and len(running) < SCAN_WORKERS * 2:
+                path, top = queued.popleft()
+                running[SCAN_POOL.submit(scan_directory_level, path)] = top
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                top = running.pop(future)
+                file_bytes, subdirs = future.result()
+                tasks_done += 1
+                tasks_found += len(subdirs)
+                dir_totals[top] += file_bytes
+                dirs_remaining[top] += len(subdirs) - 1
+                queued.extend((subdir, top) for subdir in subdirs)
+                if dirs_remaining[top]:
+                    continue
+
+                results.append(ScanEntry(top, dir_totals[top], True))
+                completed += 1
+                if completed % 10 == 0 or completed == len(entries):
+                    print(f"[DiskAnalyzer] Processed {completed}/{len(entries)} entries in {selected_path}")
+
+            # Throttle redraws and send only the progress bar; the page is refreshed when results are shown
+            progress = max(progress, tasks_done / tasks_found)
+            scan_progress_bar.value = progress
+            now = time.monotonic()
+            if now - last_progress_update >= PROGRESS_UPDATE_INTERVAL or tasks_done == tasks_found:
+                last_progress_update = now
+                scan_progress_bar.update()
 
         if not scan_thread_state["cancelled"]:
-            results.sort(key=lambda x: x["size"], reverse=True)
+            results.sort(key=get_size, reverse=True)
             update_status(f"Scan complete: {len(results)} items found in {os.path.basename(selected_path)}")
 
             # Cache the results for future navigation
@@ -525,22 +629,8 @@ def main(page: ft.Page):
         """Check if delete button should be enabled based on selections."""
         debug_log("=== CHECKING DELETE BUTTON STATE ===")
 
-        has_selection = False
-        has_unsafe = False
-
-        for i, control in enumerate(scan_results_list.controls):
-            if hasattr(control, "trailing") and hasattr(control.trailing, "controls"):
-                trailing_controls = control.trailing.controls
-                if len(trailing_controls) > 0 and isinstance(trailing_controls[0], ft.Checkbox):
-                    checkbox = trailing_controls[0]
-                    if checkbox.value and hasattr(control, "data"):
-                        has_selection = True
-                        path = control.data
-                        safety_info = get_safety_info(path)
-                        debug_log(f"  Control {i}: selected, path={path}, safety={safety_info['safety']}")
-                        if safety_info["safety"] == "red":
-                            has_unsafe = True
-                            break
+        has_selection = bool(selected_paths)
+        has_unsafe = selection_state["unsafe"] > 0
 
         button_should_be_enabled = has_selection and not has_unsafe
         debug_log(
@@ -574,16 +664,11 @@ def main(page: ft.Page):
         directory_dropdown.disabled = True
         manual_path_field.disabled = True
         scan_status_text.value = f"Scanning {path}..."
-        scan_results_list.controls.clear()
+        clear_scan_results()
         page.update()
 
         threading.Thread(target=scan_directory_thread, args=(path,), daemon=True).start()
 
-    # Create deletion manager with proper closure
-    delete_selected_handler, delete_selected_items = create_deletion_manager(
-        page, scan_results_list, scan_thread_state, scan_and_display
-    )
-
     # Confirmation UI elements (hidden by default)
     confirmation_row = ft.Row(
         controls=[
@@ -688,176 +773,207 @@ def main(page: ft.Page):
         """Handle delete button click with inline confirmation."""
         debug_log("Delete button clicked")
 
-        selected_items = []
-        unsafe_items = []
-
-        # Collect selected items and check safety
-        for control in scan_results_list.controls:
-            if hasattr(control, "trailing") and hasattr(control.trailing, "controls"):
-                trailing_controls = control.trailing.controls
-                if len(trailing_controls) > 0 and isinstance(trailing_controls[0], ft.Checkbox):
-                    checkbox = trailing_controls[0]
-                    if checkbox.value and hasattr(control, "data"):
-                        path = control.data
-                        safety_info = get_safety_info(path)
-                        selected_items.append({"path": path, "safety": safety_info["safety"]})
-
-                        if safety_info["safety"] == "red":
-                            unsafe_items.append(path)
-
-        if not selected_items:
+        if not selected_paths:
             scan_status_text.value = "No items selected for deletion."
             page.update()
             return
 
-        if unsafe_items:
-            unsafe_names = [os.path.basename(p) for p in unsafe_items]
+        # The full list of names is only built to report the refusal
+        if selection_state["unsafe"]:
+            unsafe_names = [os.path.basename(path) for path, safety in selected_paths.items() if safety == "red"]
             scan_status_text.value = f"Cannot delete unsafe items (red): {', '.join(unsafe_names)}"
             page.update()
             return
 
         # Show inline confirmation
+        selected_items = [{"path": path, "safety": safety} for path, safety in selected_paths.items()]
         show_confirmation_ui(selected_items)
 
-    def display_scan_results(results, current_path):
-        scan_results_list.controls.clear()
-        update_breadcrumbs(current_path)
+    # Row handlers are shared by every Disk Analyzer row and find their path in e.control.data
+    def ai_analyze_handler(e):
+        path = e.control.data
+        # Show loading state
+        e.control.icon = ft.Icons.HOURGLASS_EMPTY
+        e.control.tooltip = "Analyzing..."
+        page.update()
 
-        # Add ".." entry to go up
-        if current_path != "/":
-            parent_dir = os.path.dirname(current_path)
-            scan_results_list.controls.append(
-                ft.ListTile(
-                    title=ft.Text(".."),
-                    leading=ft.Icon(ft.Icons.ARROW_UPWARD),
-                    on_click=lambda _, p=parent_dir: scan_and_display(p),
-                )
-            )
+        # Perform AI analysis in a separate thread
+        def analyze():
+            result = ai_analyze_path(path)
+
+            # Update the UI on the main thread
+            def update_ui():
+                # Find and update the safety dot and AI icon
+                for control in scan_results_list.controls:
+                    if hasattr(control, "data") and control.data == path:
+                        # Update safety dot color
+                        if len(control.leading.controls) > 0:
+                            control.leading.controls[0].bgcolor = get_safety_color(result["safety"])
+                        # Update AI icon
+                        if len(control.trailing.controls) > 1:
+                            ai_icon = control.trailing.controls[1]
+                            ai_icon.icon = ft.Icons.PSYCHOLOGY
+                            ai_icon.tooltip = result["reason"]
+                            ai_icon.icon_color = get_safety_color(result["safety"])
+                            # ai_icon.bgcolor = get_safety_color(result["safety"])
+                        page.update()
+                # Re-check a checked row with the guard's own cache-then-rule lookup; an uncached heuristic
+                # result (AI disabled or no key) must not downgrade a red rule
+                if path in selected_paths:
+                    select_path(path, get_safety_info(path)["safety"])
+                    check_delete_button_state()
 
-        for item in results:
-            is_dir = item["is_dir"]
-            icon = ft.Icons.FOLDER if is_dir else ft.Icons.INSERT_DRIVE_FILE
+            update_ui()
 
-            # Get safety information for this path
-            safety_info = get_safety_info(item["path"])
-            safety_color = get_safety_color(safety_info["safety"])
+        threading.Thread(target=analyze, daemon=True).start()
 
-            def create_ai_analyze_handler(path):
-                def handler(e):
-                    # Show loading state
-                    e.control.icon = ft.Icons.HOURGLASS_EMPTY
-                    e.control.tooltip = "Analyzing..."
-                    page.update()
+    def checkbox_handler(e):
+        path = e.control.data
+        debug_log(f"Checkbox clicked for path: {path}")
+        debug_log(f"Checkbox new value: {e.control.value}")
+        if e.control.value:
+            select_path(path, get_safety_info(path)["safety"])
+        else:
+            deselect_path(path)
+        check_delete_button_state()
+
+    def directory_click_handler(e):
+        scan_and_display(e.control.data)
+
+    def build_result_tile(item):
+        """Build the Disk Analyzer row for one ScanEntry."""
+        is_dir = item.is_dir
+        icon = ft.Icons.FOLDER if is_dir else ft.Icons.INSERT_DRIVE_FILE
+
+        # Get safety information for this path, along with any cached AI analysis
+        safety_info, cached_ai = classify_path(item.path)
+        safety_color = get_safety_color(safety_info["safety"])
+
+        # Create safety dot
+        safety_dot = ft.Container(
+            width=12,
+            height=12,
+            bgcolor=safety_color,
+            border_radius=6,
+            tooltip=safety_info["reason"],
+        )
 
-                    # Perform AI analysis in a separate thread
-                    def analyze():
-                        result = ai_analyze_path(path)
-
-                        # Update the UI on the main thread
-                        def update_ui():
-                            # Find and update the safety dot and AI icon
-                            for control in scan_results_list.controls:
-                                if hasattr(control, "data") and control.data == path:
-                                    # Update safety dot color
-                                    if len(control.leading.controls) > 0:
-                                        control.leading.controls[0].bgcolor = get_safety_color(result["safety"])
-                                    # Update AI icon
-                                    if len(control.trailing.controls) > 1:
-                                        ai_icon = control.trailing.controls[1]
-                                        ai_icon.icon = ft.Icons.PSYCHOLOGY
-                                        ai_icon.tooltip = result["reason"]
-                                        ai_icon.icon_color = get_safety_color(result["safety"])
-                                        # ai_icon.bgcolor = get_safety_color(result["safety"])
-                                    page.update()
-
-                        update_ui()
-
-                    threading.Thread(target=analyze, daemon=True).start()
+        if cached_ai:
+            ai_icon_color = get_safety_color(cached_ai.get("safety", "grey"))
+            ai_icon_tooltip = cached_ai.get("reason", "AI analysis available")
+            ai_icon_icon = ft.Icons.PSYCHOLOGY
+        else:
+            ai_icon_color = None
+            ai_icon_tooltip = "Click for AI analysis"
+            ai_icon_icon = ft.Icons.PSYCHOLOGY_OUTLINED
+
+        ai_icon = ft.IconButton(
+            icon=ai_icon_icon,
+            tooltip=ai_icon_tooltip,
+            icon_size=16,
+            on_click=ai_analyze_handler,
+            icon_color=ai_icon_color,
+            data=item.path,
+        )
 
-                return handler
+        # Create checkbox for selection
+        checkbox = ft.Checkbox(value=False, on_change=checkbox_handler, data=item.path)
+        debug_log(f"Created checkbox for {item.path}")
 
-            # Create safety dot
-            safety_dot = ft.Container(
-                width=12,
-                height=12,
-                bgcolor=safety_color,
-                border_radius=6,
-                tooltip=safety_info["reason"],
-            )
+        leading_row = ft.Row(controls=[safety_dot, ft.Icon(icon)], tight=True, spacing=8)
 
-            # Check for cached AI analysis
-            normalized_path = item["path"]
-            cached_ai = config_manager.get_cached_analysis(normalized_path)
-            if cached_ai:
-                ai_icon_color = get_safety_color(cached_ai.get("safety", "grey"))
-                ai_icon_tooltip = cached_ai.get("reason", "AI analysis available")
-                ai_icon_icon = ft.Icons.PSYCHOLOGY
-            else:
-                ai_icon_color = None
-                ai_icon_tooltip = "Click for AI analysis"
-                ai_icon_icon = ft.Icons.PSYCHOLOGY_OUTLINED
-
-            ai_icon = ft.IconButton(
-                icon=ai_icon_icon,
-                tooltip=ai_icon_tooltip,
-                icon_size=16,
-                on_click=create_ai_analyze_handler(item["path"]),
-                icon_color=ai_icon_color,
-            )
+        trailing_row = ft.Row(controls=[checkbox, ai_icon], tight=True, spacing=4)
 
-            # Create checkbox for selection
-            def create_checkbox_handler():
-                def handler(e):
-                    debug_log(f"Checkbox clicked for path: {item['path'] if 'path' in item else 'unknown'}")
-                    debug_log(f"Checkbox new value: {e.control.value if hasattr(e, 'control') else 'unknown'}")
-                    check_delete_button_state()
+        list_tile = ft.ListTile(
+            title=ft.Text(os.path.basename(item.path)),
+            subtitle=ft.Text(format_size(item.size)),
+            leading=leading_row,
+            trailing=trailing_row,
+            on_click=directory_click_handler if is_dir else None,
+            data=item.path,  # Store path for reference
+        )
 
-                return handler
+        return list_tile
 
-            checkbox = ft.Checkbox(value=False, on_change=create_checkbox_handler())
-            debug_log(f"Created checkbox for {item['path']}")
+    # Results of the current listing and how many of them have rows; large folders are rendered a page at a time
+    shown_results = {"items": [], "count": 0}
 
-            leading_row = ft.Row(controls=[safety_dot, ft.Icon(icon)], tight=True, spacing=8)
+    def build_show_more_tile():
+        remaining = len(shown_results["items"]) - shown_results["count"]
+        return ft.ListTile(
+            title=ft.Text(f"Show {min(remaining, SCAN_RESULTS_PAGE_SIZE)} more ({remaining} not shown)"),
+            leading=ft.Icon(ft.Icons.EXPAND_MORE),
+            on_click=show_more_handler,
+        )
 
-            trailing_row = ft.Row(controls=[checkbox, ai_icon], tight=True, spacing=4)
+    def show_more_handler(e):
+        items = shown_results["items"]
+        start = shown_results["count"]
+        end = min(len(items), start + SCAN_RESULTS_PAGE_SIZE)
+        shown_results["count"] = end
+
+        controls = scan_results_list.controls
+        controls.pop()  # the "Show more" row is always last
+        controls.extend(build_result_tile(item) for item in items[start:end])
+        if end < len(items):
+            controls.append(build_show_more_tile())
+        page.update()
 
-            # Create proper click handler with closure
-            def create_directory_click_handler(path, is_directory):
-                if is_directory:
-                    return lambda _: scan_and_display(path)
-                else:
-                    return None
-
-            list_tile = ft.ListTile(
-                title=ft.Text(os.path.basename(item["path"])),
-                subtitle=ft.Text(format_size(item["size"])),
-                leading=leading_row,
-                trailing=trailing_row,
-                on_click=create_directory_click_handler(item["path"], is_dir),
-                data=item["path"],  # Store path for reference
+    def display_scan_results(results, current_path):
+        clear_selection()  # New rows start unchecked
+        confirmation_row.visible = False
+        update_breadcrumbs(current_path)
+
+        # Rows are collected locally and swapped into the ListView in a single assignment
+        tiles = []
+
+        # Add ".." entry to go up
+        if current_path != "/":
+            parent_dir = os.path.dirname(current_path)
+            tiles.append(
+                ft.ListTile(
+                    title=ft.Text(".."),
+                    leading=ft.Icon(ft.Icons.ARROW_UPWARD),
+                    on_click=lambda _, p=parent_dir: scan_and_display(p),
+                )
             )
 
-            scan_results_list.controls.append(list_tile)
+        shown_results["items"] = results
+        shown_results["count"] = min(len(results), SCAN_RESULTS_PAGE_SIZE)
+        tiles.extend(build_result_tile(item) for item in results[: shown_results["count"]])
+        if shown_results["count"] < len(results):
+            tiles.append(build_show_more_tile())
 
+        scan_results_list.controls = tiles
         scan_status_text.value = f"Scan of {current_path} complete. Found {len(results)} items."
         delete_button.visible = False
         page.update()
 
+    # Path the breadcrumb row currently shows; navigating back to it (refresh, cached listing) keeps the row as is
+    breadcrumb_state = {"path": None}
+
     def update_breadcrumbs(path):
-        breadcrumb_row.controls.clear()
+        """Rebuild the breadcrumb row for path. Callers refresh the page afterwards."""
+        if path == breadcrumb_state["path"]:
+            return
+        breadcrumb_state["path"] = path
+
+        crumbs = []
         parts = path.split(os.sep)
         if path == "/":
             parts = [""]
 
+        current_path_str = ""
         for i, part in enumerate(parts):
             if i == 0 and part == "":
                 current_path_str = "/"
                 display_part = "/"
             else:
-                current_path_str = os.path.join(*parts[: i + 1])
+                # Extend the previous crumb's path instead of re-joining every leading part
+                current_path_str = os.path.join(current_path_str, part)
                 display_part = part
 
-            breadcrumb_row.controls.append(
+            crumbs.append(
                 ft.Container(
                     content=ft.Text(display_part),
                     on_click=lambda e, p=current_path_str: scan_and_display(p),
@@ -867,8 +983,8 @@ def main(page: ft.Page):
                 )
             )
             if i < len(parts) - 1:
-                breadcrumb_row.controls.append(ft.Text("/"))
-        page.update()
+                crumbs.append(ft.Text("/"))
+        breadcrumb_row.controls = crumbs
 
     def reset_scan_ui():
         scan_button.disabled = False
@@ -877,6 +993,7 @@ def main(page: ft.Page):
         manual_path_field.disabled = False
         if scan_thread_state["cancelled"]:
             scan_status_text.value = "Scan cancelled."
+            clear_scan_results()
         scan_thread_state["cancelled"] = False
         scan_progress_bar.value = 0
         page.update()
@@ -909,6 +1026,7 @@ def main(page: ft.Page):
             if selected_path == "clear_cache":
                 # Clear cache option selected
                 directory_cache.clear()
+                directory_level_cache.clear()
                 update_status(f"Directory cache cleared ({len(directory_cache)} entries)")
                 debug_log("[DiskAnalyzer] Directory cache manually cleared")
                 directory_dropdown.value = scan_thread_state["current_path"]  # Reset to current path
@@ -923,22 +1041,9 @@ def main(page: ft.Page):
         page.update()
 
     directory_dropdown = ft.Dropdown(
-        value=os.path.expanduser("~"),
-        options=[
-            ft.dropdown.Option("/", "System Root (/)"),
-            ft.dropdown.Option("/System", "System Files (/System)"),
-            ft.dropdown.Option("/Applications", "Applications (/Applications)"),
-            ft.dropdown.Option("/Users", "All Users (/Users)"),
-            ft.dropdown.Option(os.path.expanduser("~"), "My Home (~/)"),
-            ft.dropdown.Option(os.path.expanduser("~/Library"), "My Library (~/Library)"),
-            ft.dropdown.Option(os.path.expanduser("~/Downloads"), "Downloads (~/Downloads)"),
-            ft.dropdown.Option(os.path.expanduser("~/Documents"), "Documents (~/Documents)"),
-            ft.dropdown.Option(os.path.expanduser("~/Desktop"), "Desktop (~/Desktop)"),
-            ft.dropdown.Option(os.path.expanduser("~/Pictures"), "Pictures (~/Pictures)"),
-            ft.dropdown.Option(os.path.expanduser("~/Movies"), "Movies (~/Movies)"),
-            ft.dropdown.Option(os.path.expanduser("~/Music"), "Music (~/Music)"),
-            ft.dropdown.Option("clear_cache", "🗑️ Clear Cache"),
-        ],
+        value=HOME,
+        # Option controls belong to a single page, so only the (value, label) pairs are shared
+        options=[ft.dropdown.Option(value, label) for value, label in DIRECTORY_OPTIONS],
         width=400,
     )
 
@@ -1018,18 +1123,17 @@ def main(page: ft.Page):
     )
 
     # --- Settings Tab --- #
-    settings_tab = create_settings_tab(page)
+    # Built on first visit so its controls stay off the startup path
+    settings_tab = ft.Container(expand=True)
+
+    def on_tab_change(e):
+        if tabs.tabs[tabs.selected_index].content is settings_tab and settings_tab.content is None:
+            settings_tab.content = create_settings_tab(page)
+            settings_tab.update()
 
     # --- License Tab --- #
     def create_license_tab():
-        # Read the license file
-        license_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "LICENSE")
-        license_text = ""
-        try:
-            with open(license_path, "r", encoding="utf-8") as f:
-                license_text = f.read()
-        except Exception as e:
-            license_text = f"Error reading license file: {e}"
+        license_text = read_license_text()
 
         return ft.Column(
             [
@@ -1064,6 +1168,7 @@ def main(page: ft.Page):
             ft.Tab(text="Settings", content=settings_tab),
             ft.Tab(text="License", content=license_tab),
         ],
+        on_change=on_tab_change,
         expand=True,
     )
 
@@ -1091,3 +1196,6 @@ if __name__ == "__main__":
         port=0,  # Use random available port
         web_renderer=ft.WebRenderer.HTML,
     )
+    # The window is closed: drop queued scan and sizing work so exiting only waits for tasks already running
+    SCAN_POOL.shutdown(wait=False, cancel_futures=True)
+    shutdown_pools()
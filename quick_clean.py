@@ -15,16 +15,25 @@ Applications will recreate needed cache directories automatically.
 from __future__ import annotations
 
 import os
+import re
 import fnmatch
 from dataclasses import dataclass
 from typing import List, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from operator import attrgetter
 
 from config import debug_log
 from deletion import perform_deletion
 
 HOME = os.path.expanduser("~")
 
+# Long-lived pools shared by every analysis; threads start lazily on first use. main.py calls shutdown_pools()
+# once the window closes: the interpreter joins pool threads before atexit handlers run, so that would be too late.
+# Gatherers run on CATEGORY_POOL and block on their entries' sizes from SIZE_POOL. The two are kept separate
+# so a gatherer never waits on work queued behind itself; SIZE_POOL tasks (directory_size) never submit back.
+CATEGORY_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="quick-clean-category")
+SIZE_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="quick-clean-size")
+
 # Category identifiers
 USER_CACHE = "user_cache"
 SYSTEM_LOGS = "system_logs"
@@ -55,7 +64,7 @@ CATEGORY_LABELS = {
 }
 
 
-@dataclass
+@dataclass(slots=True)
 class QuickCleanItem:
     path: str
     size: int
@@ -70,311 +79,255 @@ class QuickCleanResult:
 
 # ---------------- Size Helpers ---------------- #
 
+# Key for summing and sorting items by size without a Python-level lambda per element
+get_size = attrgetter("size")
+
 
 def format_size(size_bytes: int) -> str:
     if size_bytes <= 0:
         return "0 B"
-    units = ["B", "KB", "MB", "GB", "TB"]
-    idx = 0
-    s = float(size_bytes)
-    while s >= 1024 and idx < len(units) - 1:
-        s /= 1024
-        idx += 1
-    return f"{s:.2f} {units[idx]}"
+    if size_bytes < 1024:
+        return f"{size_bytes} B"  # whole bytes; no float formatting for the many small files
+    units = ("B", "KB", "MB", "GB", "TB")
+    idx = min((size_bytes.bit_length() - 1) // 10, len(units) - 1)
+    return f"{size_bytes / (1 << (idx * 10)):.2f} {units[idx]}"
+
+
+# Results of scan_directory_level from earlier Disk Analyzer scans and Quick Clean sizings,
+# as path -> ((st_dev, st_ino, st_mtime_ns), file_bytes, subdirs). A directory's mtime changes when entries
+# are added, removed or renamed in it, so a matching stat means the listing can be reused; files rewritten
+# in place keep their old size until the cache is cleared (Quick Clean's Refresh Sizes, Disk Analyzer's Clear Cache).
+directory_level_cache = {}
+
+# Entries kept in directory_level_cache before it is dropped and rebuilt by the next scans
+DIRECTORY_LEVEL_CACHE_MAX = 200_000
+
+# os.scandir accepts a directory file descriptor on macOS and Linux
+SCANDIR_BY_FD = os.scandir in os.supports_fd and hasattr(os, "O_DIRECTORY")
+
+
+def scan_directory_level(path: str) -> Tuple[int, Tuple[str, ...]]:
+    """
+    List one directory with os.scandir.
+    Returns (bytes of regular files directly inside path, paths of its subdirectories).
+    File types come from readdir and each file costs at most one lstat; symlinks are skipped
+    and unreadable entries count as zero. Unchanged directories are answered from
+    directory_level_cache with a single stat.
+    """
+    try:
+        st = os.stat(path, follow_symlinks=False)
+    except OSError:
+        return 0, ()
+    identity = (st.st_dev, st.st_ino, st.st_mtime_ns)
+    cached = directory_level_cache.get(path)
+    if cached is not None and cached[0] == identity:
+        return cached[1], cached[2]
+
+    file_bytes = 0
+    subdirs = []
+    dir_fd = None
+    try:
+        # Listing through a directory fd makes each entry's lstat relative to it (fstatat),
+        # so the kernel does not resolve the full path again for every file in deep trees
+        if SCANDIR_BY_FD:
+            dir_fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW)
+        prefix = path if path.endswith(os.sep) else path + os.sep
+        with os.scandir(path if dir_fd is None else dir_fd) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(prefix + entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        file_bytes += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    pass
+    except OSError:
+        return 0, ()
+    finally:
+        if dir_fd is not None:
+            os.close(dir_fd)
+
+    subdirs = tuple(subdirs)
+    if len(directory_level_cache) >= DIRECTORY_LEVEL_CACHE_MAX:
+        directory_level_cache.clear()
+    directory_level_cache[path] = (identity, file_bytes, subdirs)
+    return file_bytes, subdirs
 
 
 def directory_size(path: str) -> int:
+    """Total bytes of regular files under path, skipping symlinks; unchanged directories come from the level cache."""
     total = 0
-    for root, dirs, files in os.walk(path, onerror=lambda e: None):  # noqa: B023
-        for f in files:
-            fp = os.path.join(root, f)
-            if os.path.islink(fp):
-                continue
-            try:
-                total += os.path.getsize(fp)
-            except OSError:
-                pass
+    pending = [path]
+    while pending:
+        file_bytes, subdirs = scan_directory_level(pending.pop())
+        total += file_bytes
+        pending.extend(subdirs)
     return total
 
 
-# ---------------- Gathering Functions ---------------- #
-
-
-def gather_user_cache() -> List[QuickCleanItem]:
-    cache_root = os.path.join(HOME, "Library", "Caches")
-    items: List[QuickCleanItem] = []
-    if not os.path.isdir(cache_root):
-        return items
+def entry_size(entry: os.DirEntry) -> int:
+    """Size of a directory tree or single file (a symlink counts as itself) from a scandir entry; 0 if unreadable."""
     try:
-        for entry in os.scandir(cache_root):
-            path = entry.path
-            try:
-                size = directory_size(path) if entry.is_dir(follow_symlinks=False) else os.path.getsize(path)
-            except OSError:
-                size = 0
-            if size > 0:
-                items.append(QuickCleanItem(path, size, USER_CACHE))
+        if entry.is_dir(follow_symlinks=False):
+            return directory_size(entry.path)
+        return entry.stat(follow_symlinks=False).st_size
     except OSError:
-        pass
-    return items
+        return 0
 
 
-def gather_system_logs() -> List[QuickCleanItem]:
+def sized_items(entries: List[os.DirEntry], category: str, min_size: int = 0) -> List[QuickCleanItem]:
+    """Size entries in parallel on SIZE_POOL and keep those larger than min_size, in listing order."""
+    sizes = SIZE_POOL.map(entry_size, entries)
+    return [QuickCleanItem(entry.path, size, category) for entry, size in zip(entries, sizes) if size > min_size]
+
+
+def file_items(entries: List[os.DirEntry], category: str) -> List[QuickCleanItem]:
+    """Items for non-empty files, sized with one lstat each from their scandir entries; unreadable ones are skipped."""
     items: List[QuickCleanItem] = []
-    log_paths = ["/private/var/log", os.path.join(HOME, "Library", "Logs")]
-    patterns = ["*.log", "*.0", "system.log.*"]
-    for base in log_paths:
-        if not os.path.isdir(base):
-            continue
+    for entry in entries:
         try:
-            for entry in os.scandir(base):
-                path = entry.path
-                if entry.is_dir(follow_symlinks=False):
-                    continue  # skip directories; stay shallow
-                name = os.path.basename(path)
-                if any(fnmatch.fnmatch(name, pat) for pat in patterns):
-                    try:
-                        size = os.path.getsize(path)
-                    except OSError:
-                        size = 0
-                    if size > 0:
-                        items.append(QuickCleanItem(path, size, SYSTEM_LOGS))
+            size = entry.stat(follow_symlinks=False).st_size
         except OSError:
             continue
+        if size > 0:
+            items.append(QuickCleanItem(entry.path, size, category))
     return items
 
 
-def gather_trash() -> List[QuickCleanItem]:
-    trash_root = os.path.join(HOME, ".Trash")
-    items: List[QuickCleanItem] = []
-    if not os.path.isdir(trash_root):
-        return items
+def list_entries(path: str) -> List[os.DirEntry]:
+    """Entries directly inside path; empty if it cannot be listed."""
     try:
-        for entry in os.scandir(trash_root):
-            path = entry.path
-            if entry.is_dir(follow_symlinks=False):
-                size = directory_size(path)
-            else:
-                try:
-                    size = os.path.getsize(path)
-                except OSError:
-                    size = 0
-            if size > 0:
-                items.append(QuickCleanItem(path, size, TRASH))
+        with os.scandir(path) as it:
+            return list(it)
     except OSError:
-        pass
-    return items
+        return []
+
+
+def glob_union(patterns: List[str]) -> re.Pattern:
+    """Compile shell globs into one anchored regex, so a name is matched with a single call."""
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+
+
+# ---------------- Gathering Functions ---------------- #
+
+# Log file names collected from the log directories
+_LOG_NAME_RE = glob_union(["*.log", "*.0", "system.log.*"])
+
+# Diagnostic report file types collected as crash reports
+_CRASH_REPORT_SUFFIXES = (".crash", ".diag", ".panic")
+
+# Common cache subdirectories in Application Support
+_APP_SUPPORT_CACHE_NAME_RE = glob_union(["*Cache*", "*cache*", "*Caches*", "*caches*"])
+
+
+def gather_user_cache() -> List[QuickCleanItem]:
+    cache_root = os.path.join(HOME, "Library", "Caches")
+    return sized_items(list_entries(cache_root), USER_CACHE)
+
+
+def gather_system_logs() -> List[QuickCleanItem]:
+    log_paths = ["/private/var/log", os.path.join(HOME, "Library", "Logs")]
+    logs = [
+        entry
+        for base in log_paths
+        for entry in list_entries(base)
+        if not entry.is_dir(follow_symlinks=False) and _LOG_NAME_RE.match(entry.name)  # stay shallow
+    ]
+    return file_items(logs, SYSTEM_LOGS)
+
+
+def gather_trash() -> List[QuickCleanItem]:
+    trash_root = os.path.join(HOME, ".Trash")
+    return sized_items(list_entries(trash_root), TRASH)
 
 
 def gather_ios_backups() -> List[QuickCleanItem]:
     backup_root = os.path.join(HOME, "Library", "Application Support", "MobileSync", "Backup")
-    items: List[QuickCleanItem] = []
-    if not os.path.isdir(backup_root):
-        return items
-    try:
-        for entry in os.scandir(backup_root):
-            path = entry.path
-            if entry.is_dir(follow_symlinks=False):
-                size = directory_size(path)
-                if size > 0:
-                    items.append(QuickCleanItem(path, size, IOS_BACKUPS))
-    except OSError:
-        pass
-    return items
+    backups = [entry for entry in list_entries(backup_root) if entry.is_dir(follow_symlinks=False)]
+    return sized_items(backups, IOS_BACKUPS)
 
 
 def gather_macos_installers() -> List[QuickCleanItem]:
-    items: List[QuickCleanItem] = []
-    app_dir = "/Applications"
-    try:
-        for entry in os.scandir(app_dir):
-            if entry.name.startswith("Install macOS") and entry.name.endswith(".app"):
-                path = entry.path
-                try:
-                    size = directory_size(path) if entry.is_dir(follow_symlinks=False) else os.path.getsize(path)
-                except OSError:
-                    size = 0
-                if size > 0:
-                    items.append(QuickCleanItem(path, size, MACOS_INSTALLERS))
-    except OSError:
-        pass
-    return items
+    installers = [
+        entry
+        for entry in list_entries("/Applications")
+        if entry.name.startswith("Install macOS") and entry.name.endswith(".app")
+    ]
+    return sized_items(installers, MACOS_INSTALLERS)
 
 
 def gather_xcode_derived_data() -> List[QuickCleanItem]:
     derived_data_root = os.path.join(HOME, "Library", "Developer", "Xcode", "DerivedData")
-    items: List[QuickCleanItem] = []
-    if not os.path.isdir(derived_data_root):
-        return items
-    try:
-        for entry in os.scandir(derived_data_root):
-            path = entry.path
-            try:
-                size = directory_size(path) if entry.is_dir(follow_symlinks=False) else os.path.getsize(path)
-            except OSError:
-                size = 0
-            if size > 0:
-                items.append(QuickCleanItem(path, size, XCODE_DERIVED_DATA))
-    except OSError:
-        pass
-    return items
+    return sized_items(list_entries(derived_data_root), XCODE_DERIVED_DATA)
 
 
 def gather_ios_simulators() -> List[QuickCleanItem]:
     simulator_root = os.path.join(HOME, "Library", "Developer", "CoreSimulator", "Devices")
-    items: List[QuickCleanItem] = []
-    if not os.path.isdir(simulator_root):
-        return items
-    try:
-        for entry in os.scandir(simulator_root):
-            path = entry.path
-            if entry.is_dir(follow_symlinks=False):
-                size = directory_size(path)
-                if size > 0:
-                    items.append(QuickCleanItem(path, size, IOS_SIMULATORS))
-    except OSError:
-        pass
-    return items
+    devices = [entry for entry in list_entries(simulator_root) if entry.is_dir(follow_symlinks=False)]
+    return sized_items(devices, IOS_SIMULATORS)
 
 
 def gather_crash_reports() -> List[QuickCleanItem]:
-    items: List[QuickCleanItem] = []
     crash_paths = [os.path.join(HOME, "Library", "Logs", "DiagnosticReports"), "/Library/Logs/DiagnosticReports"]
-    for base in crash_paths:
-        if not os.path.isdir(base):
-            continue
-        try:
-            for entry in os.scandir(base):
-                path = entry.path
-                if entry.is_file(follow_symlinks=False) and (
-                    path.endswith(".crash") or path.endswith(".diag") or path.endswith(".panic")
-                ):
-                    try:
-                        size = os.path.getsize(path)
-                    except OSError:
-                        size = 0
-                    if size > 0:
-                        items.append(QuickCleanItem(path, size, CRASH_REPORTS))
-        except OSError:
-            continue
-    return items
+    reports = [
+        entry
+        for base in crash_paths
+        for entry in list_entries(base)
+        if entry.is_file(follow_symlinks=False) and entry.name.endswith(_CRASH_REPORT_SUFFIXES)
+    ]
+    return file_items(reports, CRASH_REPORTS)
 
 
 def gather_mail_attachments() -> List[QuickCleanItem]:
-    items: List[QuickCleanItem] = []
-    # Check for both old and new Mail attachment locations
+    # Check for both old and new Mail attachment locations: ~/Library/Mail/V*/MailData/Attachments
+    # and ~/Library/Mail/MailData/Attachments. The versioned folders are found with one listing of ~/Library/Mail.
+    mail_root = os.path.join(HOME, "Library", "Mail")
     mail_paths = [
-        os.path.join(HOME, "Library", "Mail", "V*", "MailData", "Attachments"),
-        os.path.join(HOME, "Library", "Mail", "MailData", "Attachments"),
+        os.path.join(entry.path, "MailData", "Attachments")
+        for entry in list_entries(mail_root)
+        if entry.name.startswith("V") and entry.is_dir(follow_symlinks=False)
     ]
+    mail_paths.append(os.path.join(mail_root, "MailData", "Attachments"))
 
-    for mail_path_pattern in mail_paths:
-        import glob
-
-        for mail_path in glob.glob(mail_path_pattern):
-            if not os.path.isdir(mail_path):
-                continue
-            try:
-                for root, dirs, files in os.walk(mail_path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        try:
-                            size = os.path.getsize(file_path)
-                            if size > 0:
-                                items.append(QuickCleanItem(file_path, size, MAIL_ATTACHMENTS))
-                        except OSError:
-                            pass
-            except OSError:
-                continue
-    return items
+    # One item per attachment folder (one per message) rather than per file; a large Mail store
+    # holds tens of thousands of attachment files
+    candidates: List[os.DirEntry] = []
+    for mail_path in mail_paths:
+        candidates.extend(list_entries(mail_path))
+    return sized_items(candidates, MAIL_ATTACHMENTS)
 
 
 def gather_temp_files() -> List[QuickCleanItem]:
-    items: List[QuickCleanItem] = []
-    temp_paths = ["/private/var/tmp", "/private/var/folders"]
-
-    for base in temp_paths:
-        if not os.path.isdir(base):
-            continue
-        try:
-            if base == "/private/var/folders":
-                # For /private/var/folders, go one level deeper to find temp files
-                for entry in os.scandir(base):
-                    if entry.is_dir(follow_symlinks=False):
-                        temp_subdir = entry.path
-                        try:
-                            for subentry in os.scandir(temp_subdir):
-                                if subentry.is_dir(follow_symlinks=False):
-                                    path = subentry.path
-                                    size = directory_size(path)
-                                    if size > 1024 * 1024:  # Only include if > 1MB
-                                        items.append(QuickCleanItem(path, size, TEMP_FILES))
-                        except OSError:
-                            continue
-            else:
-                for entry in os.scandir(base):
-                    path = entry.path
-                    try:
-                        size = directory_size(path) if entry.is_dir(follow_symlinks=False) else os.path.getsize(path)
-                        if size > 1024 * 1024:  # Only include if > 1MB
-                            items.append(QuickCleanItem(path, size, TEMP_FILES))
-                    except OSError:
-                        pass
-        except OSError:
-            continue
-    return items
+    candidates = list_entries("/private/var/tmp")
+    # For /private/var/folders, go one level deeper to find temp files
+    for entry in list_entries("/private/var/folders"):
+        if entry.is_dir(follow_symlinks=False):
+            candidates.extend(sub for sub in list_entries(entry.path) if sub.is_dir(follow_symlinks=False))
+    return sized_items(candidates, TEMP_FILES, min_size=1024 * 1024)  # Only include if > 1MB
 
 
 def gather_disk_images() -> List[QuickCleanItem]:
-    items: List[QuickCleanItem] = []
     search_paths = [os.path.join(HOME, "Downloads"), os.path.join(HOME, "Documents"), os.path.join(HOME, "Desktop")]
-
-    for base in search_paths:
-        if not os.path.isdir(base):
-            continue
-        try:
-            for entry in os.scandir(base):
-                if entry.is_file(follow_symlinks=False) and entry.name.endswith(".dmg"):
-                    path = entry.path
-                    try:
-                        size = os.path.getsize(path)
-                        if size > 0:
-                            items.append(QuickCleanItem(path, size, DISK_IMAGES))
-                    except OSError:
-                        pass
-        except OSError:
-            continue
-    return items
+    images = [
+        entry
+        for base in search_paths
+        for entry in list_entries(base)
+        if entry.is_file(follow_symlinks=False) and entry.name.endswith(".dmg")
+    ]
+    return file_items(images, DISK_IMAGES)
 
 
 def gather_app_support_caches() -> List[QuickCleanItem]:
     app_support_root = os.path.join(HOME, "Library", "Application Support")
-    items: List[QuickCleanItem] = []
-    if not os.path.isdir(app_support_root):
-        return items
 
-    # Common cache subdirectories in Application Support
-    cache_patterns = ["*Cache*", "*cache*", "*Caches*", "*caches*"]
-
-    try:
-        for entry in os.scandir(app_support_root):
-            if entry.is_dir(follow_symlinks=False):
-                app_dir = entry.path
-                try:
-                    for subentry in os.scandir(app_dir):
-                        if subentry.is_dir(follow_symlinks=False):
-                            for pattern in cache_patterns:
-                                if fnmatch.fnmatch(subentry.name, pattern):
-                                    path = subentry.path
-                                    size = directory_size(path)
-                                    if size > 0:
-                                        items.append(QuickCleanItem(path, size, APP_SUPPORT_CACHES))
-                                    break
-                except OSError:
-                    continue
-    except OSError:
-        pass
-    return items
+    cache_dirs = [
+        subentry
+        for entry in list_entries(app_support_root)
+        if entry.is_dir(follow_symlinks=False)
+        for subentry in list_entries(entry.path)
+        if subentry.is_dir(follow_symlinks=False) and _APP_SUPPORT_CACHE_NAME_RE.match(subentry.name)
+    ]
+    return sized_items(cache_dirs, APP_SUPPORT_CACHES)
 
 
 GATHERERS = {
@@ -392,23 +345,37 @@ GATHERERS = {
     APP_SUPPORT_CACHES: gather_app_support_caches,
 }
 
+
+def run_gatherer(category: str, call) -> List[QuickCleanItem]:
+    try:
+        return call()
+    except Exception as e:  # noqa: BLE001
+        debug_log(f"Error gathering category {category}: {e}")
+        return []
+
+
+def gather_categories(selected_categories: List[str]):
+    """Yield (category, items) as each gatherer finishes; a lone category runs inline instead of on CATEGORY_POOL."""
+    categories = [c for c in selected_categories if c in GATHERERS]
+    if len(categories) == 1:
+        yield categories[0], run_gatherer(categories[0], GATHERERS[categories[0]])
+        return
+    futures = {CATEGORY_POOL.submit(GATHERERS[c]): c for c in categories}
+    for fut in as_completed(futures):
+        yield futures[fut], run_gatherer(futures[fut], fut.result)
+
+
 # ---------------- Public API ---------------- #
 
 
 def analyze_quick_clean(selected_categories: List[str]) -> QuickCleanResult:
     debug_log(f"Analyzing quick clean categories: {selected_categories}")
     items: List[QuickCleanItem] = []
-    with ThreadPoolExecutor(max_workers=min(4, len(selected_categories) or 1)) as tp:
-        futures = {tp.submit(GATHERERS[c]): c for c in selected_categories if c in GATHERERS}
-        for fut in as_completed(futures):
-            try:
-                gathered = fut.result()
-                items.extend(gathered)
-            except Exception as e:  # noqa: BLE001
-                debug_log(f"Error gathering category {futures[fut]}: {e}")
-    total_size = sum(i.size for i in items)
+    for _, gathered in gather_categories(selected_categories):
+        items.extend(gathered)
+    total_size = sum(map(get_size, items))
     # Sort largest first
-    items.sort(key=lambda i: i.size, reverse=True)
+    items.sort(key=get_size, reverse=True)
     debug_log(f"Quick clean analysis complete: {len(items)} items, total size {format_size(total_size)}")
     return QuickCleanResult(items=items, total_size=total_size)
 
@@ -420,6 +387,12 @@ def perform_quick_clean(result: QuickCleanResult, categories: List[str]) -> Tupl
     return perform_deletion(paths)
 
 
+def shutdown_pools():
+    """Cancel queued gatherer and sizing work so the process can exit without finishing every directory walk."""
+    CATEGORY_POOL.shutdown(wait=False, cancel_futures=True)
+    SIZE_POOL.shutdown(wait=False, cancel_futures=True)
+
+
 __all__ = [
     "USER_CACHE",
     "SYSTEM_LOGS",
@@ -439,18 +412,12 @@ __all__ = [
     "analyze_quick_clean",
     "analyze_quick_clean_iter",
     "perform_quick_clean",
+    "shutdown_pools",
     "format_size",
 ]
 
 
 def analyze_quick_clean_iter(selected_categories: List[str]):
-    """Yield (category, items, total_size_for_category) sequentially for streaming UI updates."""
-    for cat in selected_categories:
-        if cat not in GATHERERS:
-            continue
-        try:
-            items = GATHERERS[cat]()
-        except Exception as e:  # noqa: BLE001
-            debug_log(f"Error gathering category {cat}: {e}")
-            items = []
-        yield cat, items, sum(i.size for i in items)
+    """Yield (category, items, total_size_for_category) as each category finishes, gathering them concurrently."""
+    for cat, items in gather_categories(selected_categories):
+        yield cat, items, sum(map(get_size, items))
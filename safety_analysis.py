@@ -1,8 +1,11 @@
 import os
+import re
+import time
 import fnmatch
 import json
+from functools import lru_cache
 import flet as ft
-from config import PREDEFINED_RULES, debug_log
+from config import AI_CONFIG, PREDEFINED_RULES, debug_log
 from config_manager import config_manager
 
 """Safety Analysis for CoffeeCleaner.
@@ -26,35 +29,82 @@ except ImportError:
     OPENAI_AVAILABLE = False
     debug_log("OpenAI not available. Install with: pip install openai")
 
+# Optional faster JSON parser for AI responses; orjson.JSONDecodeError subclasses json.JSONDecodeError
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
 
+
+@lru_cache(maxsize=8192)
 def normalize_path(path):
-    """Normalize a path by expanding ~ and resolving .. components."""
+    """Normalize a path by expanding ~ and resolving .. components (memoized; the result is a pure function of path)."""
     return os.path.normpath(os.path.expanduser(path))
 
 
-def get_safety_info(path):
+_GLOB_WILDCARD = re.compile(r"[*?[]")
+
+
+def _compile_rule(pattern, info):
+    """Return (literal prefix before the first wildcard, compiled regex, info) for a rule glob."""
+    normalized_pattern = normalize_path(pattern)
+    prefix = _GLOB_WILDCARD.split(normalized_pattern, maxsplit=1)[0]
+    return prefix, re.compile(fnmatch.translate(normalized_pattern)), info
+
+
+# PREDEFINED_RULES globs translated to regexes once, instead of by fnmatch on every lookup.
+# Ordered by literal prefix length so the most specific rule wins (sort is stable for ties),
+# and a cheap startswith() check skips the regex for rules that cannot match.
+_COMPILED_RULES = sorted(
+    (_compile_rule(pattern, info) for pattern, info in PREDEFINED_RULES.items()),
+    key=lambda rule: len(rule[0]),
+    reverse=True,
+)
+
+# Shared result for paths that no predefined rule covers
+UNKNOWN_SAFETY_INFO = {"safety": "grey", "reason": "Safety level unknown. Click AI icon for analysis."}
+
+
+@lru_cache(maxsize=4096)
+def _lookup_predefined_rule(path):
     """
-    Determine safety level and reason for a given path using predefined rules.
-    Returns a dict with 'safety' (green/orange/red/grey) and 'reason'.
+    Return (normalized_path, info) for the first predefined rule matching path.
+    The rules never change at runtime, so results are memoized per input path.
     """
     normalized_path = normalize_path(path)
+    for prefix, rule_regex, info in _COMPILED_RULES:
+        if normalized_path.startswith(prefix) and rule_regex.match(normalized_path):
+            return normalized_path, info
+    return normalized_path, UNKNOWN_SAFETY_INFO
+
+
+def classify_path(path):
+    """
+    Return (safety info, cached AI analysis or None) for a path, consulting the AI cache once.
+    The safety info is the cached analysis when there is one, otherwise the predefined rule result.
+    """
+    normalized_path, info = _lookup_predefined_rule(path)
 
-    # Check cache first
+    # Cached AI analyses take precedence over the rules; check them on every call
     cached_result = config_manager.get_cached_analysis(normalized_path)
     if cached_result:
         debug_log(f"Using cached analysis for {path}")
-        return cached_result
+        return cached_result, cached_result
 
-    # Check against predefined rules
-    for pattern, info in PREDEFINED_RULES.items():
-        pattern_normalized = normalize_path(pattern)
-        if fnmatch.fnmatch(normalized_path, pattern_normalized):
-            debug_log(f"Matched predefined rule for {path}: {info['safety']}")
-            return info
+    if info is UNKNOWN_SAFETY_INFO:
+        # If no rule matches, return grey (unknown) to trigger AI analysis later
+        debug_log(f"No predefined rule found for {path}, marking as unknown")
+    else:
+        debug_log(f"Matched predefined rule for {path}: {info['safety']}")
+    return info, None
 
-    # If no rule matches, return grey (unknown) to trigger AI analysis later
-    debug_log(f"No predefined rule found for {path}, marking as unknown")
-    return {"safety": "grey", "reason": "Safety level unknown. Click AI icon for analysis."}
+
+def get_safety_info(path):
+    """
+    Determine safety level and reason for a given path using predefined rules.
+    Returns a dict with 'safety' (green/orange/red/grey) and 'reason'.
+    """
+    return classify_path(path)[0]
 
 
 def ai_analyze_path(path, force_provider=None):
@@ -97,11 +147,9 @@ def ai_analyze_path(path, force_provider=None):
             return _fallback_heuristic_analysis(normalized_path)
         else:
             return {"safety": "grey", "reason": f"Error: No valid {provider} API key"}
-        return _fallback_heuristic_analysis(normalized_path)
 
     # Try AI analysis
     try:
-        provider = config_manager.get_preferred_ai_provider()
         if provider == "gemini" and GEMINI_AVAILABLE:
             result = _analyze_with_gemini(normalized_path)
         elif provider == "openai" and OPENAI_AVAILABLE:
@@ -110,99 +158,115 @@ def ai_analyze_path(path, force_provider=None):
             debug_log(f"AI provider {provider} not available, using fallback")
             result = _fallback_heuristic_analysis(normalized_path)
 
-        # Cache the result
-        config_manager.cache_analysis(normalized_path, result)
-        return result
+        # Cache the result; if a concurrent analysis of the same path got there first, return its result
+        return config_manager.cache_analysis(normalized_path, result)
 
     except Exception as e:
         debug_log(f"AI analysis failed for {path}: {e}")
         return _fallback_heuristic_analysis(normalized_path)
 
 
-def _fallback_heuristic_analysis(path):
-    """
-    Fallback heuristic analysis when AI is not available.
-    Uses simple rules based on file names and extensions.
-    """
-    debug_log(f"Using heuristic analysis for {path}")
+def _keyword_regex(keywords, suffix=""):
+    """Compile keywords into one alternation so a basename is scanned once per category."""
+    return re.compile(f"(?:{'|'.join(map(re.escape, keywords))}){suffix}")
 
-    basename = os.path.basename(path).lower()
 
-    # Safe patterns (green)
-    safe_patterns = ["cache", "temp", "tmp", "log", ".ds_store", "thumbs.db", ".localized", "desktop.ini", "icon\r"]
-    if any(pattern in basename for pattern in safe_patterns):
-        return {
+_HEURISTIC_API_KEY_HINT = "Add an API Key in Settings for AI analysis"
+
+# Fallback heuristic as (regex searched in the lowercased basename, result) pairs, checked in priority order.
+# The result dicts are built once and shared between calls, like UNKNOWN_SAFETY_INFO.
+_HEURISTIC_RULES = (
+    (
+        _keyword_regex(
+            ("cache", "temp", "tmp", "log", ".ds_store", "thumbs.db", ".localized", "desktop.ini", "icon\r")
+        ),
+        {
             "safety": "green",
             "reason": (
                 "Heuristic Analysis: Appears to be temporary/cache files. Likely safe to delete. "
-                "Add an API Key in Settings for AI analysis"
+                + _HEURISTIC_API_KEY_HINT
             ),
-        }
-
-    # Safe file extensions
-    safe_extensions = [".tmp", ".cache", ".log", ".bak", ".old", ".orig"]
-    if any(basename.endswith(ext) for ext in safe_extensions):
-        return {
+        },
+    ),
+    (
+        _keyword_regex((".tmp", ".cache", ".log", ".bak", ".old", ".orig"), suffix=r"\Z"),
+        {
             "safety": "green",
             "reason": (
-                "Heuristic Analysis: Temporary file extension. Likely safe to delete. "
-                "Add an API Key in Settings for AI analysis"
+                "Heuristic Analysis: Temporary file extension. Likely safe to delete. " + _HEURISTIC_API_KEY_HINT
             ),
-        }
-
-    # Caution patterns (orange)
-    caution_patterns = ["config", "pref", "setting", "preference", "profile"]
-    if any(pattern in basename for pattern in caution_patterns):
-        return {
+        },
+    ),
+    (
+        _keyword_regex(("config", "pref", "setting", "preference", "profile")),
+        {
             "safety": "orange",
             "reason": (
                 "Heuristic Analysis: Configuration or preference files. Deleting may affect "
-                "application behavior. Add an API Key in Settings for AI analysis"
+                "application behavior. " + _HEURISTIC_API_KEY_HINT
             ),
-        }
-
-    # System/dangerous patterns (red)
-    danger_patterns = ["system", "kernel", "driver", "boot", "recovery", "firmware"]
-    if any(pattern in basename for pattern in danger_patterns):
-        return {
+        },
+    ),
+    (
+        _keyword_regex(("system", "kernel", "driver", "boot", "recovery", "firmware")),
+        {
             "safety": "red",
             "reason": (
-                "Heuristic Analysis: System-related files. Not recommended for deletion. "
-                "Add an API Key in Settings for AI analysis"
+                "Heuristic Analysis: System-related files. Not recommended for deletion. " + _HEURISTIC_API_KEY_HINT
             ),
-        }
+        },
+    ),
+)
 
-    # Default to caution
-    return {
-        "safety": "orange",
-        "reason": (
-            "Heuristic Analysis: Unknown file type. Exercise caution when deleting. "
-            "Add an API Key in Settings for AI analysis"
-        ),
-    }
+_HEURISTIC_DEFAULT = {
+    "safety": "orange",
+    "reason": "Heuristic Analysis: Unknown file type. Exercise caution when deleting. " + _HEURISTIC_API_KEY_HINT,
+}
 
 
-def _analyze_with_gemini(path):
-    """Analyze path using Google Gemini API."""
-    debug_log(f"Analyzing {path} with Gemini AI")
+def _fallback_heuristic_analysis(path):
+    """
+    Fallback heuristic analysis when AI is not available.
+    Uses simple rules based on file names and extensions.
+    """
+    debug_log(f"Using heuristic analysis for {path}")
 
-    if not GEMINI_AVAILABLE:
-        raise Exception("Gemini API not available")
-    api_key = config_manager.get_gemini_api_key()
-    if not api_key:
-        raise Exception("No Gemini API key configured")
+    basename = os.path.basename(path).lower()
+    for keyword_regex, result in _HEURISTIC_RULES:
+        if keyword_regex.search(basename):
+            return result
 
-    # Configure Gemini
-    genai.configure(api_key=api_key)
+    # Default to caution
+    return _HEURISTIC_DEFAULT
+
+
+def _is_rate_limited(error):
+    """True for provider rate-limit errors (HTTP 429): openai's RateLimitError, google's ResourceExhausted."""
+    if type(error).__name__ in ("RateLimitError", "ResourceExhausted"):
+        return True
+    return 429 in (
+        getattr(error, "code", None),
+        getattr(error, "status_code", None),
+        getattr(error, "http_status", None),
+    )
 
-    # Use the model from configuration
-    from config import AI_CONFIG
 
-    model_name = AI_CONFIG.get("model", "gemini-1.5-flash")
-    model = genai.GenerativeModel(model_name)
+def _retry_rate_limited(request, *args, **kwargs):
+    """Call request, retrying rate-limited attempts after 1, 2, 4... seconds up to AI_CONFIG max_retries times."""
+    max_retries = AI_CONFIG.get("max_retries", 3)
+    for attempt in range(max_retries + 1):
+        try:
+            return request(*args, **kwargs)
+        except Exception as e:
+            if attempt == max_retries or not _is_rate_limited(e):
+                raise
+            delay = 2**attempt
+            debug_log(f"AI provider rate limited, retrying in {delay}s: {e}")
+            time.sleep(delay)
 
-    # Create analysis prompt
-    prompt = f"""
+
+def _analysis_prompt(path):
+    return f"""
     Analyze this macOS file/directory path for deletion safety: {path}
 
     Context: This is a macOS file cleaner application. Users want to know if it's safe to
@@ -222,36 +286,56 @@ def _analyze_with_gemini(path):
     Consider the file path, common macOS directory structures, and typical user needs.
     """
 
-    response = model.generate_content(prompt)
+
+# A response wrapped in a markdown code block, optionally tagged json
+_CODE_FENCE = re.compile(r"```(?:json)?\s*(.*?)\s*```\s*\Z", re.DOTALL)
+
+
+def _parse_ai_response(response_text):
+    """Parse the JSON in an AI response, unwrapping a markdown code block if the model added one."""
+    fenced = _CODE_FENCE.match(response_text)
+    return _json_loads(fenced.group(1) if fenced else response_text)
+
+
+def _ai_result(result):
+    """Validate a parsed {safety, reason} object and add the AI prefix to its reason."""
+    if not isinstance(result, dict) or "safety" not in result or "reason" not in result:
+        raise ValueError("Invalid response format")
+    result["reason"] = f"AI Analysis: {result['reason']}"
+    return result
+
+
+@lru_cache(maxsize=1)
+def _gemini_model(api_key, model_name):
+    """
+    Configure Gemini and build the model once, rather than on every request.
+    genai.configure is process-wide, so only the current key and model are kept; changing either reconfigures.
+    """
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
+
+
+def _analyze_with_gemini(path):
+    """Analyze path using Google Gemini API."""
+    debug_log(f"Analyzing {path} with Gemini AI")
+
+    if not GEMINI_AVAILABLE:
+        raise Exception("Gemini API not available")
+    api_key = config_manager.get_gemini_api_key()
+    if not api_key:
+        raise Exception("No Gemini API key configured")
+
+    # Use the model from configuration
+    model = _gemini_model(api_key, AI_CONFIG.get("model", "gemini-1.5-flash"))
+
+    response = _retry_rate_limited(model.generate_content, _analysis_prompt(path))
 
     # Parse the response
     try:
         response_text = response.text.strip()
         debug_log(f"Raw Gemini response: {response_text}")
-
-        # Handle markdown code blocks
-        if response_text.startswith("```json"):
-            # Extract JSON from markdown code block
-            start = response_text.find("```json") + 7
-            end = response_text.rfind("```")
-            if end > start:
-                response_text = response_text[start:end].strip()
-        elif response_text.startswith("```"):
-            # Handle generic code blocks
-            start = response_text.find("```") + 3
-            end = response_text.rfind("```")
-            if end > start:
-                response_text = response_text[start:end].strip()
-
-        result = json.loads(response_text)
+        result = _ai_result(_parse_ai_response(response_text))
         debug_log(f"Parsed Gemini AI analysis for {path}: {result}")
-
-        # Validate the response format
-        if not isinstance(result, dict) or "safety" not in result or "reason" not in result:
-            raise ValueError("Invalid response format")
-
-        # Add AI prefix to reason
-        result["reason"] = f"AI Analysis: {result['reason']}"
         return result
 
     except (json.JSONDecodeError, ValueError) as e:
@@ -273,30 +357,10 @@ def _analyze_with_openai(path):
     # Configure OpenAI
     openai.api_key = api_key
 
-    # Create analysis prompt
-    prompt = f"""
-    Analyze this macOS file/directory path for deletion safety: {path}
-
-    Context: This is a macOS file cleaner application. Users want to know if it's safe to
-    delete this item.
-
-    Please respond with ONLY a JSON object in this exact format:
-    {{
-        "safety": "green|orange|red",
-        "reason": "Brief explanation of why it's safe/unsafe to delete"
-    }}
-
-    Safety levels:
-    - green: Safe to delete (cache, temp files, user files that can be easily replaced)
-    - orange: Caution needed (user data, preferences, may affect apps but not critical)
-    - red: Do not delete (system files, critical applications, essential data)
-
-    Consider the file path, common macOS directory structures, and typical user needs.
-    """
-
-    response = openai.ChatCompletion.create(
+    response = _retry_rate_limited(
+        openai.ChatCompletion.create,
         model="gpt-4.1",
-        messages=[{"role": "user", "content": prompt}],
+        messages=[{"role": "user", "content": _analysis_prompt(path)}],
         max_tokens=200,
     )
 
@@ -304,30 +368,8 @@ def _analyze_with_openai(path):
     try:
         response_text = response.choices[0].message.content.strip()
         debug_log(f"Raw OpenAI response: {response_text}")
-
-        # Handle markdown code blocks
-        if response_text.startswith("```json"):
-            # Extract JSON from markdown code block
-            start = response_text.find("```json") + 7
-            end = response_text.rfind("```")
-            if end > start:
-                response_text = response_text[start:end].strip()
-        elif response_text.startswith("```"):
-            # Handle generic code blocks
-            start = response_text.find("```") + 3
-            end = response_text.rfind("```")
-            if end > start:
-                response_text = response_text[start:end].strip()
-
-        result = json.loads(response_text)
+        result = _ai_result(_parse_ai_response(response_text))
         debug_log(f"Parsed OpenAI analysis for {path}: {result}")
-
-        # Validate the response format
-        if not isinstance(result, dict) or "safety" not in result or "reason" not in result:
-            raise ValueError("Invalid response format")
-
-        # Add AI prefix to reason
-        result["reason"] = f"AI Analysis: {result['reason']}"
         return result
 
     except (json.JSONDecodeError, ValueError) as e:
@@ -336,12 +378,27 @@ def _analyze_with_openai(path):
         raise Exception("Invalid AI response format")
 
 
+def check_ai_connection(provider):
+    """
+    Analyze a sample path with provider, bypassing the heuristic fallback and the analysis cache.
+    Raises with the provider's error when the request fails.
+    """
+    if provider == "gemini":
+        return _analyze_with_gemini("/tmp/test_file.txt")
+    if provider == "openai":
+        return _analyze_with_openai("/tmp/test_file.txt")
+    raise ValueError(f"Unknown AI provider: {provider}")
+
+
+# Flet color for each safety level; unknown levels are shown grey
+_SAFETY_COLORS = {
+    "green": ft.Colors.GREEN,
+    "orange": ft.Colors.ORANGE,
+    "red": ft.Colors.RED,
+    "grey": ft.Colors.GREY_400,
+}
+
+
 def get_safety_color(safety_level):
     """Return the appropriate color for the safety level."""
-    colors = {
-        "green": ft.Colors.GREEN,
-        "orange": ft.Colors.ORANGE,
-        "red": ft.Colors.RED,
-        "grey": ft.Colors.GREY_400,
-    }
-    return colors.get(safety_level, ft.Colors.GREY_400)
+    return _SAFETY_COLORS.get(safety_level, ft.Colors.GREY_400)
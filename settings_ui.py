@@ -3,18 +3,36 @@ Settings UI for CoffeeCleaner
 Allows users to configure API keys and application preferences.
 """
 
+import asyncio
+import hashlib
+import time
+
 import flet as ft
 from config_manager import config_manager
 from mac_permissions import open_full_disk_access_pane
+from safety_analysis import check_ai_connection
+
+# Seconds a successful connection test is reused before the provider is contacted again
+API_TEST_CACHE_TTL = 60
+
+# Recent successful connection tests: (provider, sha256 of API key) -> timestamp
+_api_test_cache = {}
+
+
+def _api_test_cache_key(provider, api_key):
+    """Build the connection test cache key without keeping the raw API key in memory."""
+    return provider, hashlib.sha256(api_key.encode()).hexdigest()
 
 
 def create_settings_tab(page: ft.Page) -> ft.Column:
     """Create the settings tab UI."""
+    gemini_key = config_manager.get_gemini_api_key()
+    openai_key = config_manager.get_openai_api_key()
 
     # API Key section
     gemini_key_field = ft.TextField(
         label="Gemini API Key",
-        value=config_manager.get_gemini_api_key(),
+        value=gemini_key,
         password=True,
         can_reveal_password=True,
         width=400,
@@ -23,7 +41,7 @@ def create_settings_tab(page: ft.Page) -> ft.Column:
 
     openai_key_field = ft.TextField(
         label="OpenAI API Key",
-        value=config_manager.get_openai_api_key(),
+        value=openai_key,
         password=True,
         can_reveal_password=True,
         width=400,
@@ -47,13 +65,13 @@ def create_settings_tab(page: ft.Page) -> ft.Column:
 
     # Status indicators
     gemini_status = ft.Text(
-        value="✓ Valid" if config_manager.get_gemini_api_key() else "⚠ Not configured",
-        color=ft.Colors.GREEN if config_manager.get_gemini_api_key() else ft.Colors.ORANGE,
+        value="✓ Valid" if gemini_key else "⚠ Not configured",
+        color=ft.Colors.GREEN if gemini_key else ft.Colors.ORANGE,
     )
 
     openai_status = ft.Text(
-        value="✓ Valid" if config_manager.get_openai_api_key() else "⚠ Not configured",
-        color=ft.Colors.GREEN if config_manager.get_openai_api_key() else ft.Colors.ORANGE,
+        value="✓ Valid" if openai_key else "⚠ Not configured",
+        color=ft.Colors.GREEN if openai_key else ft.Colors.ORANGE,
     )
 
     # Full Disk Access section elements (now always 'Not Granted')
@@ -69,36 +87,49 @@ def create_settings_tab(page: ft.Page) -> ft.Column:
 
     def update_status_indicators():
         """Update the status indicators."""
-        gemini_status.value = "✓ Valid" if config_manager.get_gemini_api_key() else "⚠ Not configured"
-        gemini_status.color = ft.Colors.GREEN if config_manager.get_gemini_api_key() else ft.Colors.ORANGE
+        gemini_key = config_manager.get_gemini_api_key()
+        gemini_status.value = "✓ Valid" if gemini_key else "⚠ Not configured"
+        gemini_status.color = ft.Colors.GREEN if gemini_key else ft.Colors.ORANGE
 
-        openai_status.value = "✓ Valid" if config_manager.get_openai_api_key() else "⚠ Not configured"
-        openai_status.color = ft.Colors.GREEN if config_manager.get_openai_api_key() else ft.Colors.ORANGE
+        openai_key = config_manager.get_openai_api_key()
+        openai_status.value = "✓ Valid" if openai_key else "⚠ Not configured"
+        openai_status.color = ft.Colors.GREEN if openai_key else ft.Colors.ORANGE
 
         cache_info.value = f"Cached AI analyses: {config_manager.get_cache_size()}"
-        page.update()
+
+    def apply_settings():
+        """Persist the field values and refresh the indicators; the caller updates the page."""
+        # Previous connection test results are stale once the provider or a key changes
+        if (
+            gemini_key_field.value != config_manager.get_gemini_api_key()
+            or openai_key_field.value != config_manager.get_openai_api_key()
+            or ai_provider_dropdown.value != config_manager.get_preferred_ai_provider()
+        ):
+            _api_test_cache.clear()
+
+        # Save API keys
+        config_manager.set_gemini_api_key(gemini_key_field.value)
+        config_manager.set_openai_api_key(openai_key_field.value)
+        config_manager.set_preferred_ai_provider(ai_provider_dropdown.value)
+        config_manager.set_ai_analysis_enabled(enable_ai_checkbox.value)
+
+        update_status_indicators()
 
     def save_settings(e):
         """Save all settings."""
         try:
-            # Save API keys
-            config_manager.set_gemini_api_key(gemini_key_field.value)
-            config_manager.set_openai_api_key(openai_key_field.value)
-            config_manager.set_preferred_ai_provider(ai_provider_dropdown.value)
-            config_manager.set_ai_analysis_enabled(enable_ai_checkbox.value)
+            apply_settings()
 
             status_text.value = "✓ Settings saved successfully!"
             status_text.color = ft.Colors.GREEN
 
-            update_status_indicators()
-
         except Exception as ex:
             status_text.value = f"✗ Error saving settings: {str(ex)}"
             status_text.color = ft.Colors.RED
 
         page.update()
 
-    def test_api_connection(e):
+    async def test_api_connection(e):
         """Test the API connection."""
         provider = ai_provider_dropdown.value
 
@@ -109,17 +140,34 @@ def create_settings_tab(page: ft.Page) -> ft.Column:
             status_text.value = "⚠ Please enter an OpenAI API key first"
             status_text.color = ft.Colors.ORANGE
         else:
-            status_text.value = "🔄 Testing API connection..."
-            status_text.color = ft.Colors.BLUE
-            page.update()
-
-            # TODO: Implement actual API test
-            # For now, just simulate a successful test
-            import time
-
-            time.sleep(1)
-            status_text.value = "✓ API connection test successful!"
-            status_text.color = ft.Colors.GREEN
+            # The analyzer reads keys from the config, so persist the fields first
+            apply_settings()
+            api_key = gemini_key_field.value if provider == "gemini" else openai_key_field.value
+            cache_key = _api_test_cache_key(provider, api_key.strip())
+            tested_at = _api_test_cache.get(cache_key)
+
+            if tested_at and time.time() - tested_at < API_TEST_CACHE_TTL:
+                success, message = True, ""
+            else:
+                status_text.value = "🔄 Testing API connection..."
+                status_text.color = ft.Colors.BLUE
+                page.update()
+
+                try:
+                    await asyncio.to_thread(check_ai_connection, provider)
+                    success, message = True, ""
+                except Exception as ex:
+                    success, message = False, str(ex)
+                # Only successes are reused; a failure may be transient (network, quota), so retest on every click
+                if success:
+                    _api_test_cache[cache_key] = time.time()
+
+            if success:
+                status_text.value = "✓ API connection test successful!"
+                status_text.color = ft.Colors.GREEN
+            else:
+                status_text.value = f"✗ API connection test failed: {message}"
+                status_text.color = ft.Colors.RED
 
         page.update()
 